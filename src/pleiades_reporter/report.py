@@ -8,8 +8,7 @@
 """
 Define a standard report object
 """
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
 import logging
 from mdclense.parser import MarkdownParser
 from pleiades_reporter.text import norm
@@ -30,12 +29,14 @@ class PleiadesReport:
     - when (date of the reported change/event)
     """
 
+    __slots__ = ("_title", "_summary", "_text", "_markdown", "_when")
+
     def __init__(self, **kwargs):
         self._title = ""
         self._summary = ""
         self._text = ""
         self._markdown = ""
-        self._when = datetime.now(tz=pytz.utc)
+        self._when = datetime.now(tz=timezone.utc)
         for k, v in kwargs.items():
             setattr(self, k, v)
 
@@ -78,10 +79,7 @@ class PleiadesReport:
         logger.debug(f"s: '{s}'")
         s_clean = norm(s, preserve=["\n"], trim=False)
         logger.debug(f"norm(s): '{s_clean}'")
-        while s_clean[0] == "\n":
-            s_clean = s_clean[1:]
-        while s_clean[-1] == "\n":
-            s_clean = s_clean[:-1]
+        s_clean = s_clean.strip("\n")
         logger.debug(f"s_clean final: '{s_clean}'")
         self._markdown = s_clean
 
@@ -9,11 +9,21 @@
 Manipulate text strings
 """
 
+import re
 import textnorm
+import unicodedata
 
+_WS_RE = re.compile(r"\s+")
 
-def norm(s: str, preserve: list = list(), trim: bool = True) -> str:
+
+def norm(s: str, preserve: list | None = None, trim: bool = True) -> str:
     """Normalize unicode and whitespace in a string."""
-    return textnorm.normalize_space(
-        textnorm.normalize_unicode(s), preserve=preserve, trim=trim
-    )
+    if not s.isascii() and not unicodedata.is_normalized("NFC", s):
+        # ASCII and already-composed strings (the usual case) pass through as-is
+        s = unicodedata.normalize("NFC", s)
+    if not preserve:
+        # same results as textnorm, without its per-call overhead
+        if trim:
+            return " ".join(s.split())
+        return _WS_RE.sub(" ", s)
+    return textnorm.normalize_space(s, preserve=preserve, trim=trim)
@@ -9,30 +9,146 @@
 Report on activity in the Pleaides Zotero Library
 """
 from pleiades_reporter.report import PleiadesReport
-from datetime import datetime, timedelta
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from itertools import takewhile
 import json
-from logging import getLogger
+from logging import DEBUG, getLogger
 from markdownify import markdownify
-from os import environ
+from math import isfinite
+from os import environ, replace
 from pathlib import Path
 from platformdirs import user_cache_dir
 from pprint import pprint, pformat
-import pytz
+from random import uniform
 from requests import Response
+from time import monotonic
+from types import MappingProxyType
 from urllib.parse import urlparse
 from webiquette.webi import Webi
+from xml.etree import ElementTree
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 API_BASE = "https://api.zotero.org"
 LIBRARY_ID = "2533"
-API_KEY = environ["ZOTERO_API_KEY"]
-HEADERS = {
-    "User-Agent": "PleiadesReporter/0.1 (+https://pleiades.stoa.org)",
-    "Zotero-API-Version": "3",
-    "Zotero-API-Key": API_KEY,
-}
+ITEMS_URI = f"{API_BASE}/groups/{LIBRARY_ID}/items"
+ITEMS_TOP_URI = f"{ITEMS_URI}/top"
+WEB_ITEMS_URI = f"https://www.zotero.org/groups/{LIBRARY_ID}/pleiades/items"
+HEADERS = MappingProxyType(
+    {
+        "User-Agent": "PleiadesReporter/0.1 (+https://pleiades.stoa.org)",
+        "Zotero-API-Version": "3",
+    }
+)
+_EMPTY_MAPPING = MappingProxyType(dict())  # read-only default for headers and params
+BACKOFF_BASE = 1.0  # seconds; first delay after a 429 without Retry-After
+BACKOFF_CAP = 300.0  # seconds; longest delay after a 429 without Retry-After
+BACKOFF_MAX_EXPONENT = 16  # keeps BACKOFF_BASE * 2**n finite however many 429s arrive
+CITATION_STYLE = "chicago-fullnote-bibliography"
+CSL_MARKDOWN = {"b": "**", "div": "", "em": "*", "i": "*", "span": "", "strong": "**"}
+ITEM_KEYS_PER_REQUEST = 50  # Zotero's limit on keys in an itemKey parameter
+ITEMS_PER_PAGE = 100  # Zotero's limit on items in one page of results
+SORT_NEWEST_ADDED_FIRST = MappingProxyType({"sort": "dateAdded", "direction": "desc"})
 WEB_CACHE_DURATION = 67  # minutes
+VERSION_PROBE_TTL = 60  # seconds to trust a version probe; keep below polling period
 CACHE_DIR_PATH = Path(user_cache_dir("pleiades_reporter"))
 
+_webis = dict()  # Webi instances shared among reporters, keyed by netloc and headers
+
+
+def _added_after(date_added: str, since_iso: str, since_datetime: datetime) -> bool:
+    """
+    Compare a Zotero dateAdded string with a cutoff, parsing it only if it is not in the usual format
+    """
+    if len(date_added) == len(since_iso):
+        return date_added > since_iso
+    return datetime.fromisoformat(date_added) > since_datetime
+
+
+def _csl_to_md(elem: ElementTree.Element) -> str:
+    """
+    Convert the contents of a CSL entry element to markdown
+    Raises ValueError on markup that is not handled here.
+    """
+    parts = [_md_escape(elem.text or "")]
+    for child in elem:
+        try:
+            marker = CSL_MARKDOWN[child.tag]
+        except KeyError:
+            raise ValueError(f"Unexpected element in citation: {child.tag}")
+        inner = _csl_to_md(child)
+        if marker and inner.strip():
+            # keep surrounding whitespace outside the emphasis markers
+            lead = " " if inner[0].isspace() else ""
+            trail = " " if inner[-1].isspace() else ""
+            inner = f"{lead}{marker}{inner.strip()}{marker}{trail}"
+        parts.append(inner)
+        parts.append(_md_escape(child.tail or ""))
+    return "".join(parts)
+
+
+@lru_cache(maxsize=2048)
+def _html_to_md(s: str) -> str:
+    """
+    Convert a formatted citation (HTML) to markdown, memoizing the result
+    Zotero's citation markup is well-formed XML with a handful of inline tags, so it is
+    walked directly; anything unexpected is left to markdownify.
+    """
+    try:
+        root = ElementTree.fromstring(s)
+        if root.get("class") == "csl-entry":
+            entries = [root]
+        else:
+            entries = root.findall(".//div[@class='csl-entry']")
+        if not entries:
+            raise ValueError("No CSL entries in citation")
+        return "\n\n".join(" ".join(_csl_to_md(e).split()) for e in entries)
+    except (ElementTree.ParseError, ValueError):
+        return markdownify(s, strip=["div"])
+
+
+def _json_loads(b: bytes):
+    """Parse JSON, using orjson if it is installed"""
+    if orjson is None:
+        return json.loads(b)
+    return orjson.loads(b)
+
+
+def _md_escape(s: str) -> str:
+    """Escape markdown emphasis characters in text, as markdownify does"""
+    return s.replace("*", r"\*").replace("_", r"\_")
+
+
+def _parse_delay(val: str | None) -> float | None:
+    """
+    Parse a Backoff or Retry-After header value (seconds or HTTP-date) into seconds
+    Returns None if there is no usable value.
+    """
+    if val is None:
+        return None
+    try:
+        seconds = float(val)
+    except ValueError:
+        pass
+    else:
+        if not isfinite(seconds):
+            return None
+        return max(0.0, seconds)
+    try:
+        when = parsedate_to_datetime(val)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        # a "-0000" zone parses as naive, but HTTP-dates are always UTC
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(tz=timezone.utc)).total_seconds())
+
 
 class ZoteroAPITooManyRequests(Exception):
     def __init__(self, msg):
@@ -46,23 +162,21 @@ class ZoteroReporter:
       per new item.
     """
 
+    # (monotonic time, version) of the last library version probe, shared by all
+    # reporters since they watch the same library
+    _version_probe_cache = None
+
     def __init__(
         self,
     ):
-        self._webi = Webi(
-            netloc=urlparse(API_BASE).netloc,
-            headers=HEADERS,
-            respect_robots_txt=False,
-            expire_after=timedelta(minutes=WEB_CACHE_DURATION),
-            cache_control=False,
-            cache_dir=str(CACHE_DIR_PATH),
-        )
+        # the API key is read here, not at import, and never written into HEADERS
+        headers = {**HEADERS, "Zotero-API-Key": environ["ZOTERO_API_KEY"]}
+        self._webi = self._get_webi(headers)
+        self._cache_dirty = False  # state changed but not yet written to the cache
         self._zot_cache_read()  # sets _last_zot_version and _last_check
-        self._last_web_request = datetime.fromisoformat("1900-01-01T12:12:12+00:00")
-        self._wait_until = (
-            self._last_web_request
-        )  # do not make another request before this datetime
-        self._wait_every_time = 0  # seconds to wait before each check
+        self._next_allowed = 0.0  # do not check again before this monotonic time
+        self._wait_every_time = 0.0  # seconds to wait after each request
+        self._retry_attempt = 0  # consecutive 429s without Retry-After
         self.logger = getLogger("zotero.ZoteroReporter")
 
     def check(
@@ -71,19 +185,18 @@ class ZoteroReporter:
         """
         Check for new Zotero records since last check and return a list of reports
         """
-        now = datetime.now(tz=pytz.utc)
-        if self._wait_until > now:
+        if monotonic() < self._next_allowed:
+            type(self)._version_probe_cache = None  # stale once we may ask again
             return list()
-        if self._wait_every_time:
-            if self._last_web_request + timedelta(seconds=self._wait_every_time) > now:
-                return list()
         if override_last_version:
             old_version = override_last_version
+            known_keys = frozenset()  # re-report everything since the override
         else:
             old_version = self.last_zot_version
+            known_keys = self._known_zot_keys
         try:
             new_version = self._check_for_latest_version(
-                reference_zot_version=old_version
+                bypass_cache=False, reference_zot_version=old_version
             )
         except ZoteroAPITooManyRequests as err:
             self.logger.error(str(err))
@@ -98,17 +211,21 @@ class ZoteroReporter:
                     since_version=old_version,
                     since_datetime=old_datetime,
                     bypass_cache=True,
+                    exclude_keys=known_keys,
                 )
+                bibs = self._zot_get_bibs([d["key"] for d in new_records])
             except ZoteroAPITooManyRequests as err:
                 self.logger.error(str(err))
                 return list()
-            now = datetime.now(tz=pytz.utc)
-            self.last_zot_version = new_version
-            self.last_check = now
+            self._known_zot_keys.update(d["key"] for d in new_records)
+            self._set_state(new_version, datetime.now(tz=timezone.utc))
         else:
             new_records = list()
+            bibs = dict()
         self.logger.debug(f"Got {len(new_records)}")
-        return [self._make_report(rec) for rec in new_records]
+        reports = [self._make_report(rec, bibs.get(rec["key"])) for rec in new_records]
+        self._zot_cache_flush()
+        return reports
 
     @property
     def last_check(self) -> datetime:
@@ -116,8 +233,8 @@ class ZoteroReporter:
 
     @last_check.setter
     def last_check(self, val: datetime):
-        self._last_check = val
-        self._zot_cache_write()
+        self._set_state(self._last_zot_version, val)
+        self._zot_cache_flush()
 
     @property
     def last_zot_version(self) -> str:
@@ -125,30 +242,61 @@ class ZoteroReporter:
 
     @last_zot_version.setter
     def last_zot_version(self, val: str):
-        self._last_zot_version = val
-        self._zot_cache_write()
+        self._set_state(val, self._last_check)
+        self._zot_cache_flush()
 
     def _check_for_latest_version(
         self, bypass_cache=True, reference_zot_version: str = ""
     ) -> str:
-        """Ask Zotero API for the latest version of our library"""
-        uri = "/".join([API_BASE, "groups", LIBRARY_ID, "items"])
+        """
+        Ask Zotero API for the latest version of our library
+        Unless bypass_cache is set, a version learned within the last VERSION_PROBE_TTL
+        seconds is reused without a request. The request itself never comes from the web
+        cache, which would hide changes for WEB_CACHE_DURATION minutes.
+        """
+        if not bypass_cache and self._version_probe_cache is not None:
+            probed_at, version = self._version_probe_cache
+            if monotonic() - probed_at < VERSION_PROBE_TTL:
+                return version
+        uri = ITEMS_URI
         if reference_zot_version:
             headers = {"If-Modified-Since-Version": reference_zot_version}
         else:
-            headers = dict()
-        r = self._zot_head(
-            uri=uri, additional_headers=headers, bypass_cache=bypass_cache
-        )
-        self._parse_zot_response_for_backoff(r)
+            headers = _EMPTY_MAPPING
+        r = self._zot_head(uri=uri, additional_headers=headers, bypass_cache=True)
         if r.status_code == 304:
             # no change
-            return reference_zot_version
+            version = reference_zot_version
+        else:
+            try:
+                version = r.headers["Last-Modified-Version"]
+            except KeyError as err:
+                err.add_note = pformat(r, indent=4)
+                raise err
+        type(self)._version_probe_cache = (monotonic(), version)
+        return version
+
+    @classmethod
+    def _get_webi(cls, headers: dict) -> Webi:
+        """
+        Get a Webi for the Zotero API, reusing its session and connection pool across reporters
+        - headers: request headers, including the Zotero-API-Key
+        """
+        netloc = urlparse(API_BASE).netloc
+        key = (netloc, tuple(sorted(headers.items())))
         try:
-            return r.headers["Last-Modified-Version"]
-        except KeyError as err:
-            err.add_note = pformat(r, indent=4)
-            raise err
+            return _webis[key]
+        except KeyError:
+            webi = Webi(
+                netloc=netloc,
+                headers=dict(headers),
+                respect_robots_txt=False,
+                expire_after=timedelta(minutes=WEB_CACHE_DURATION),
+                cache_control=False,
+                cache_dir=str(CACHE_DIR_PATH),
+            )
+            _webis[key] = webi
+            return webi
 
     def _handle_zot_response_codes(self, r: Response):
         bad_code_names = {
@@ -167,7 +315,7 @@ class ZoteroReporter:
             self.logger.debug(f"304 Not Modified")
         else:
             addendum = (
-                f" when requesting {r.uri}. Headers: {pformat(r.headers, indent=4)}"
+                f" when requesting {r.url}. Headers: {pformat(r.headers, indent=4)}"
             )
             try:
                 msg = bad_code_names[code]
@@ -177,44 +325,53 @@ class ZoteroReporter:
                 )
             raise RuntimeError(msg + addendum)
 
-    def _make_report(self, zot_rec: dict) -> PleiadesReport:
+    def _make_report(self, zot_rec: dict, bib: str | None = None) -> PleiadesReport:
         """
         Create a Pleiades report about a zotero record
+        - bib: the record's formatted citation (HTML), if it has already been fetched
         """
-        self.logger.debug(pformat(zot_rec, indent=4))
+        if self.logger.isEnabledFor(DEBUG):
+            self.logger.debug(pformat(zot_rec, indent=4))
 
-        zot_key = zot_rec["data"]["key"]
+        data = zot_rec["data"]
+        zot_key = data["key"]
 
-        # get citation
-        response = self._zot_get(
-            uri="https://api.zotero.org/groups/2533/items",
-            bypass_cache=False,
-            params={
-                "itemKey": zot_key,
-                "format": "bib",
-                "style": "chicago-fullnote-bibliography",
-            },
-        )
-        if response.status_code == 200:
-            s = response.text.replace('<?xml version="1.0"?>\n', "")
-            s = s + (
-                f"  \nBibliographic record in Zotero: https://www.zotero.org/groups/2533/pleiades/items/{zot_key}."
+        if bib is None and monotonic() >= self._next_allowed:
+            # get citation, unless Zotero has asked us to wait
+            try:
+                response = self._zot_get(
+                    uri=ITEMS_URI,
+                    bypass_cache=False,
+                    params={
+                        "itemKey": zot_key,
+                        "format": "bib",
+                        "style": CITATION_STYLE,
+                    },
+                )
+            except ZoteroAPITooManyRequests as err:
+                self.logger.error(str(err))
+            else:
+                if response.status_code == 200:
+                    bib = response.text.replace('<?xml version="1.0"?>\n', "")
+        if bib:
+            md = (
+                f"{_html_to_md(bib)}\n\n"
+                f"Bibliographic record in Zotero: {WEB_ITEMS_URI}/{zot_key}."
             )
-            md = markdownify(s, strip=["div"])
-            self.logger.debug(f"md: '{md}'")
+            self.logger.debug("md: '%s'", md)
         else:
             md = ""
 
         try:
-            st = zot_rec["data"]["shortTitle"]
+            st = data["shortTitle"]
         except KeyError:
             raise RuntimeError(pformat(zot_rec, indent=4))
 
         report = PleiadesReport(
             title=f"New in the Pleiades Zotero Library: {st}",
-            summary=zot_rec["data"]["title"],
+            summary=data["title"],
             markdown=md,
-            when=zot_rec["data"]["dateAdded"],
+            when=data["dateAdded"],
         )
         return report
 
@@ -225,63 +382,102 @@ class ZoteroReporter:
 
         # backoff
         # If the API servers are overloaded, the API may include a Backoff: <seconds> HTTP header in responses, indicating that the client should perform the minimum number of requests necessary to maintain data consistency and then refrain from making further requests for the number of seconds indicated.
-        try:
-            backoff = r.headers["backoff"]
-        except KeyError:
-            pass
-        else:
-            self._wait_until = datetime.now(tz=pytz.utc) + timedelta(seconds=backoff)
+        backoff = _parse_delay(r.headers.get("backoff"))
+        if backoff is not None:
+            self._next_allowed = max(self._next_allowed, monotonic() + backoff)
 
         # 429 + retry after
         # If a client has made too many requests within a given time period or is making too many concurrent requests, the API may return 429 Too Many Requests with a Retry-After: <seconds> header. Clients receiving a 429 should wait at least the number of seconds indicated in the header before making further requests. They should also reduce their overall request rate and/or concurrency to avoid repeatedly getting 429s, which may result in stricter throttling or temporary blocks.
         if r.status_code == 429:
-            try:
-                retry_after = r.headers["retry-after"]
-            except KeyError:
-                self._wait_every_time += 1
+            retry_after = _parse_delay(r.headers.get("retry-after"))
+            if retry_after is None:
+                # no instructions: exponential backoff with jitter
+                delay = min(
+                    BACKOFF_CAP,
+                    BACKOFF_BASE * 2 ** min(self._retry_attempt, BACKOFF_MAX_EXPONENT),
+                )
+                delay *= uniform(0.5, 1.5)
+                self._retry_attempt += 1
             else:
+                # Retry-After is authoritative, and also slows all later requests
                 self._wait_every_time = retry_after
-            self._wait_until = datetime.now(tz=pytz.utc) + timedelta(
-                seconds=self._wait_every_time
-            )
+                delay = retry_after
+            self._next_allowed = max(self._next_allowed, monotonic() + delay)
             raise ZoteroAPITooManyRequests(
-                f"Retry-After: {self._wait_every_time} (uri: {r.url})"
+                f"Retry after {delay:.0f} seconds (uri: {r.url})"
             )
+        elif r.status_code < 400:
+            # the API is answering again: relax toward normal pacing
+            self._retry_attempt = 0
+            self._wait_every_time /= 2
+            if self._wait_every_time < 1:
+                self._wait_every_time = 0.0  # done halving once under a second
+
+    def _set_state(self, zot_version: str, check_time: datetime):
+        """
+        Update the last version and last check time together; see _zot_cache_flush
+        """
+        self._last_zot_version = zot_version
+        self._last_check = check_time
+        self._cache_dirty = True
+
+    def _zot_cache_flush(self):
+        """
+        Write the local cache if state has changed since it was last written
+        """
+        if self._cache_dirty:
+            self._zot_cache_write()
 
     def _zot_cache_read(self):
         """
         Read critical Zotero info from the local cache
         - last version checked
         - last datetime checked
+        - keys of items already reported
+        The cache is a small text file with one value per line.
         """
+        self._known_zot_keys = set()
+        try:
+            lines = (
+                (CACHE_DIR_PATH / "zotero_metadata.txt")
+                .read_text(encoding="utf-8")
+                .splitlines()
+            )
+        except FileNotFoundError:
+            pass
+        else:
+            self._last_zot_version = lines[0]
+            self._last_check = datetime.fromisoformat(lines[1])
+            self._known_zot_keys.update(lines[2:])
+            return
         try:
-            with open(
-                CACHE_DIR_PATH / "zotero_metadata.json", "r", encoding="utf-8"
-            ) as f:
-                d = json.load(f)
-            del f
+            # fall back on the JSON cache written by earlier versions
+            d = _json_loads((CACHE_DIR_PATH / "zotero_metadata.json").read_bytes())
         except FileNotFoundError:
             # write a version and date that will ensure updates must be checked
             self._last_zot_version = "38632"
             self._last_check = datetime.fromisoformat("2024-01-01T12:12:12+00:00")
-            self._zot_cache_write()
         else:
             self._last_zot_version = d["last_version_checked"]
             self._last_check = datetime.fromisoformat(d["last_time_checked"])
+        self._zot_cache_write()
 
     def _zot_cache_write(self):
         """
         Write critical Zotero info to the local cache
         - last version checked
         - last datetime checked
+        - keys of items already reported
         """
-        d = {
-            "last_version_checked": self._last_zot_version,
-            "last_time_checked": self._last_check.isoformat(),
-        }
-        with open(CACHE_DIR_PATH / "zotero_metadata.json", "w", encoding="utf-8") as f:
-            json.dump(d, f)
-        del f
+        lines = [self._last_zot_version, self._last_check.isoformat()]
+        lines.extend(sorted(self._known_zot_keys))
+        payload = "\n".join(lines) + "\n"
+        path = CACHE_DIR_PATH / "zotero_metadata.txt"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        replace(tmp_path, path)
+        self._cache_dirty = False
 
     def _zot_head(self, uri, additional_headers, bypass_cache) -> Response:
         """
@@ -290,19 +486,19 @@ class ZoteroReporter:
         r = self._webi.head(
             uri, additional_headers=additional_headers, bypass_cache=bypass_cache
         )
-        self._last_web_request = datetime.now(tz=pytz.utc)
-        self.logger.debug(
-            f"_zot_head: response headers ({pformat(r.headers, indent=4)}"
+        self._next_allowed = max(
+            self._next_allowed, monotonic() + self._wait_every_time
         )
+        self.logger.debug("_zot_head: response headers (%s)", r.headers)
         self._parse_zot_response_for_backoff(r)
         return r
 
     def _zot_get(
         self,
         uri,
-        additional_headers: dict = dict(),
+        additional_headers: dict = _EMPTY_MAPPING,
         bypass_cache: bool = True,
-        params: dict = dict(),
+        params: dict = _EMPTY_MAPPING,
     ) -> Response:
         """
         Issue an HTTP GET request to the Zotero API
@@ -313,41 +509,159 @@ class ZoteroReporter:
             bypass_cache=bypass_cache,
             params=params,
         )
-        self._last_web_request = datetime.now(tz=pytz.utc)
-        self.logger.debug(f"_zot_get: response headers ({pformat(r.headers, indent=4)}")
+        self._next_allowed = max(
+            self._next_allowed, monotonic() + self._wait_every_time
+        )
+        self.logger.debug("_zot_get: response headers (%s)", r.headers)
         self._parse_zot_response_for_backoff(r)
         return r
 
+    def _zot_get_bibs(self, zot_keys: list, bypass_cache: bool = True) -> dict:
+        """
+        Get formatted citations (HTML) for items, batching keys into as few requests as possible
+        Returns a dict mapping item keys to citations.
+        A failed batch is logged and ends the fetch; the citations already received are
+        still returned.
+        """
+        bibs = dict()
+        records = self._zot_iter_items(
+            zot_keys,
+            bypass_cache=bypass_cache,
+            params={"include": "bib", "style": CITATION_STYLE},
+        )
+        try:
+            for d in records:
+                bibs[d["key"]] = d["bib"]
+        except (RuntimeError, ZoteroAPITooManyRequests) as err:
+            self.logger.error(
+                f"Got citations for {len(bibs)} of {len(zot_keys)} items: {err}"
+            )
+        return bibs
+
     def _zot_get_modified_records(
-        self, since_version: str, bypass_cache: bool = True
+        self,
+        since_version: str,
+        bypass_cache: bool = True,
+        exclude_keys: set = frozenset(),
     ) -> list:
         """
-        Get a list of records for top-level items modified since since_version
+        Get a list of records for the most recently added top-level items modified since since_version
+        Only the first page of keys is listed; keys in exclude_keys are then skipped.
         """
-        uri = "/".join([API_BASE, "groups", LIBRARY_ID, "items", "top"])
-        params = {"since": since_version, "format": "json", "includeTrashed": "0"}
-        # r = self._webi.get(uri, bypass_cache=bypass_cache, params=params)
-        r = self._zot_get(uri=uri, bypass_cache=bypass_cache, params=params)
-        if r.status_code == 200:
-            modified = r.json()
-            return modified
-        else:
-            self._handle_zot_response_codes(r)
-            return list()
+        pages = self._zot_iter_modified_keys(
+            since_version=since_version, bypass_cache=bypass_cache
+        )
+        keys = [k for k in next(pages, list()) if k not in exclude_keys]
+        return list(
+            self._zot_iter_items(
+                keys, bypass_cache=bypass_cache, params=SORT_NEWEST_ADDED_FIRST
+            )
+        )
 
     def _zot_get_new_records(
-        self, since_version: str, since_datetime: datetime, bypass_cache: bool = True
+        self,
+        since_version: str,
+        since_datetime: datetime,
+        bypass_cache: bool = True,
+        exclude_keys: set = frozenset(),
     ) -> list:
         """
         Get a list of records for top-level items that have been newly added since version and datetime
+        - exclude_keys: keys of items already reported, which are skipped
         """
-        candidates = self._zot_get_modified_records(
-            since_version=since_version, bypass_cache=bypass_cache
+        candidates = self._zot_iter_modified_records(
+            since_version=since_version,
+            bypass_cache=bypass_cache,
+            exclude_keys=exclude_keys,
+        )
+        # Zotero dates are fixed-format UTC strings (YYYY-MM-DDTHH:MM:SSZ), which
+        # sort lexicographically, so they can usually be compared without parsing
+        since_iso = since_datetime.astimezone(timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+        # candidates come newest first, so stop (and stop paging) at the first old one
+        new = list(
+            takewhile(
+                lambda d: _added_after(
+                    d["data"]["dateAdded"], since_iso, since_datetime
+                ),
+                candidates,
+            )
         )
-        new = [
-            d
-            for d in candidates
-            if datetime.fromisoformat(d["data"]["dateAdded"]) > since_datetime
-        ]
         self.logger.debug(f"_zot_get_new_records: {len(new)}")
         return new
+
+    def _zot_iter_items(
+        self, zot_keys: list, bypass_cache: bool = True, params: dict = _EMPTY_MAPPING
+    ) -> Iterator[dict]:
+        """
+        Yield JSON records for items by key, batching keys into as few requests as possible
+        - params: additional query parameters, e.g., to include formatted citations
+        Each batch is requested only when the previous one has been consumed.
+        """
+        for i in range(0, len(zot_keys), ITEM_KEYS_PER_REQUEST):
+            chunk = zot_keys[i : i + ITEM_KEYS_PER_REQUEST]
+            r = self._zot_get(
+                uri=ITEMS_URI,
+                bypass_cache=bypass_cache,
+                params={"itemKey": ",".join(chunk), "format": "json", **params},
+            )
+            if r.status_code == 200:
+                yield from _json_loads(r.content)
+            else:
+                self._handle_zot_response_codes(r)
+
+    def _zot_iter_modified_keys(
+        self, since_version: str, bypass_cache: bool = True
+    ) -> Iterator[list]:
+        """
+        Yield pages of keys of top-level items modified since since_version, most recently added first
+        Only keys and versions are listed, and each page is requested only when the previous
+        one has been consumed.
+        """
+        params = {
+            "since": since_version,
+            "format": "versions",
+            "includeTrashed": "0",
+            "limit": ITEMS_PER_PAGE,
+            **SORT_NEWEST_ADDED_FIRST,
+        }
+        start = 0
+        while True:
+            r = self._zot_get(
+                uri=ITEMS_TOP_URI,
+                additional_headers={"If-Modified-Since-Version": since_version},
+                bypass_cache=bypass_cache,
+                params={**params, "start": start},
+            )
+            if r.status_code == 304:
+                # nothing has changed since since_version; no body to parse
+                return
+            elif r.status_code != 200:
+                self._handle_zot_response_codes(r)
+            keys = list(_json_loads(r.content))
+            yield keys
+            if len(keys) < ITEMS_PER_PAGE:
+                return
+            start += ITEMS_PER_PAGE
+
+    def _zot_iter_modified_records(
+        self,
+        since_version: str,
+        bypass_cache: bool = True,
+        exclude_keys: set = frozenset(),
+    ) -> Iterator[dict]:
+        """
+        Yield records for top-level items modified since since_version, most recently added first
+        Keys are listed a page at a time, and full records are fetched in batches only for
+        keys not in exclude_keys. Nothing more is requested once the caller stops.
+        """
+        pages = self._zot_iter_modified_keys(
+            since_version=since_version, bypass_cache=bypass_cache
+        )
+        for keys in pages:
+            yield from self._zot_iter_items(
+                [k for k in keys if k not in exclude_keys],
+                bypass_cache=bypass_cache,
+                params=SORT_NEWEST_ADDED_FIRST,
+            )
@@ -38,3 +38,12 @@ class TestPleiadesReport:
         s = "Aspernatur id molestias deleniti eius quis qui corporis veritatis."
         r.summary = s
         assert r.summary == s
+
+    def test_markdown(self):
+        r = PleiadesReport(markdown="\n\n*Annales* ab excessu\n\ndivi Augusti\n")
+        assert r.markdown == "*Annales* ab excessu\n\ndivi Augusti"
+
+    def test_markdown_empty(self):
+        r = PleiadesReport(markdown="")
+        assert r.markdown == ""
+        assert r.text == ""
@@ -0,0 +1,30 @@
+#
+# This file is part of pleiades_reporter
+# by Tom Elliott for the Institute for the Study of the Ancient World
+# (c) Copyright 2024 by New York University
+# Licensed under the AGPL-3.0; see LICENSE.txt file.
+#
+
+"""
+Test the text module
+"""
+
+from pleiades_reporter.text import norm
+
+
+class TestNorm:
+    def test_norm_space(self):
+        assert norm("  Annales \t ab\nexcessu  divi Augusti ") == (
+            "Annales ab excessu divi Augusti"
+        )
+
+    def test_norm_unicode(self):
+        s = "Universita\u0308t"  # decomposed umlaut
+        assert norm(s) == "Universit\u00e4t"
+
+    def test_norm_preserve(self):
+        s = "Annales  ab \n excessu\n\ndivi  Augusti"
+        assert norm(s, preserve=["\n"]) == "Annales ab\nexcessu\n\ndivi Augusti"
+
+    def test_norm_no_trim(self):
+        assert norm("  divi  Augusti ", trim=False) == " divi Augusti "
@@ -9,9 +9,114 @@
 Test the pleiades_reporter.zotero module
 """
 
-from datetime import datetime
-from pleiades_reporter.zotero import ZoteroReporter
-import pytz
+from datetime import datetime, timedelta, timezone
+import json
+from pleiades_reporter import zotero
+from pleiades_reporter.zotero import (
+    BACKOFF_BASE,
+    BACKOFF_CAP,
+    ZoteroAPITooManyRequests,
+    ZoteroReporter,
+    _html_to_md,
+    _parse_delay,
+)
+import pytest
+from requests.structures import CaseInsensitiveDict
+from time import monotonic
+
+
+def _records(n: int, added: datetime = None) -> list:
+    """Make n Zotero item records, most recently added first"""
+    if added is None:
+        added = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "key": f"K{i:04d}",
+            "version": 40000 + n - i,
+            "data": {
+                "key": f"K{i:04d}",
+                "dateAdded": (added - timedelta(hours=i)).strftime(
+                    "%Y-%m-%dT%H:%M:%SZ"
+                ),
+                "shortTitle": f"Item {i}",
+                "title": f"Item number {i}",
+            },
+        }
+        for i in range(n)
+    ]
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200, body=None, headers=None, url=""):
+        self.status_code = status_code
+        self.content = b"" if body is None else json.dumps(body).encode()
+        self.headers = CaseInsensitiveDict(headers or dict())
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+
+class FakeWebi:
+    """
+    Answer Zotero API requests from a list of records, most recently added first
+    - status: HTTP status codes to answer with instead, keyed by "include" or "format"
+    """
+
+    def __init__(self, records: list, status: dict = None):
+        self.records = records
+        self.status = dict() if status is None else status
+        self.requests = list()
+
+    def head(self, uri, additional_headers, bypass_cache):
+        self.requests.append(("HEAD", uri, dict()))
+        version = max(r["version"] for r in self.records)
+        return FakeResponse(headers={"Last-Modified-Version": str(version)}, url=uri)
+
+    def get(self, uri, additional_headers, bypass_cache, params):
+        params = dict(params)
+        self.requests.append(("GET", uri, params))
+        status = self.status.get(params.get("include", params.get("format")), 200)
+        if status != 200:
+            return FakeResponse(status, url=uri)
+        if "itemKey" in params:
+            keys = params["itemKey"].split(",")
+            body = [dict(r) for r in self.records if r["key"] in keys]
+            if params.get("include") == "bib":
+                for r in body:
+                    r["bib"] = f'<div class="csl-entry">{r["data"]["title"]}.</div>'
+            return FakeResponse(body=body, url=uri)
+        found = [r for r in self.records if r["version"] > int(params["since"])]
+        if not found and "If-Modified-Since-Version" in additional_headers:
+            return FakeResponse(304, url=uri)
+        start = params.get("start", 0)
+        found = found[start : start + params.get("limit", len(found))]
+        if params["format"] == "versions":
+            return FakeResponse(body={r["key"]: r["version"] for r in found}, url=uri)
+        return FakeResponse(body=found, url=uri)
+
+    def gets(self, **params) -> list:
+        """Get the parameters of GET requests that included all of params"""
+        return [
+            p
+            for method, uri, p in self.requests
+            if method == "GET" and params.items() <= p.items()
+        ]
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """Make ZoteroReporters that talk to a FakeWebi and keep their cache in tmp_path"""
+    monkeypatch.setenv("ZOTERO_API_KEY", "test")
+    monkeypatch.setattr(zotero, "CACHE_DIR_PATH", tmp_path)
+    monkeypatch.setattr(ZoteroReporter, "_version_probe_cache", None)
+
+    def make(webi: FakeWebi) -> ZoteroReporter:
+        monkeypatch.setattr(ZoteroReporter, "_get_webi", lambda self, headers: webi)
+        return ZoteroReporter()
+
+    return make
 
 
 class TestZoteroReporter:
@@ -55,12 +160,16 @@ class TestZoteroReporter:
             hour=12,
             minute=12,
             second=12,
-            tzinfo=pytz.utc,
+            tzinfo=timezone.utc,
         )
         new = self.r._zot_get_new_records(
             since_version=old_version, since_datetime=old_datetime, bypass_cache=True
         )
         assert len(new) > 0
+        for d in new:
+            # string comparison of dates relies on this format
+            assert len(d["data"]["dateAdded"]) == 20
+            assert d["data"]["dateAdded"].endswith("Z")
 
     def test_check(self):
         old_version = "38632"
@@ -71,7 +180,7 @@ class TestZoteroReporter:
             hour=12,
             minute=12,
             second=12,
-            tzinfo=pytz.utc,
+            tzinfo=timezone.utc,
         )
         new = self.r.check(
             override_last_check=old_datetime, override_last_version=old_version
@@ -103,3 +212,254 @@ class TestZoteroReporter:
             "http://oracc.museum.upenn.edu/ecut/index.html."
             "\n\nBibliographic record in Zotero: https://www.zotero.org/groups/2533/pleiades/items/9CU8QAI9."
         )
+
+
+class TestHtmlToMd:
+    def test_html_to_md(self):
+        bib = (
+            '<div class="csl-bib-body" style="line-height: 1.35; margin-left: 2em; '
+            'text-indent:-2em;">\n  <div class="csl-entry"><i>Electronic Corpus of '
+            "Urartian Texts (ECUT) Project</i>. Munich: Ludwig-Maximilians-Universität "
+            "München, Historisches Seminar - Alte Geschichte, 2016. "
+            "http://oracc.museum.upenn.edu/ecut/index.html.</div>\n</div>"
+        )
+        assert _html_to_md(bib) == (
+            "*Electronic Corpus of Urartian Texts (ECUT) Project*. "
+            "Munich: Ludwig-Maximilians-Universität München, Historisches "
+            "Seminar - Alte Geschichte, 2016. "
+            "http://oracc.museum.upenn.edu/ecut/index.html."
+        )
+
+    def test_html_to_md_escape(self):
+        bib = '<div class="csl-entry">Pleiades_data *draft* <i>Tabula_Imperii</i></div>'
+        assert _html_to_md(bib) == r"Pleiades\_data \*draft\* *Tabula\_Imperii*"
+
+    def test_html_to_md_fallback(self):
+        # markup that is not handled directly is left to markdownify
+        bib = (
+            '<div class="csl-entry">See <a href="https://pleiades.stoa.org/">'
+            "Pleiades</a><sup>2</sup>.</div>"
+        )
+        assert _html_to_md(bib) == "See [Pleiades](https://pleiades.stoa.org/)2."
+
+
+class TestZoteroCache:
+    """The metadata cache is read and written without touching the network"""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(zotero, "CACHE_DIR_PATH", tmp_path)
+        self.cache_dir = tmp_path
+
+    def _reporter(self) -> ZoteroReporter:
+        # bypass __init__, which needs an API key and a Webi
+        r = ZoteroReporter.__new__(ZoteroReporter)
+        r._zot_cache_read()
+        return r
+
+    def test_first_run(self):
+        r = self._reporter()
+        assert r.last_zot_version == "38632"
+        assert r.last_check == datetime(2024, 1, 1, 12, 12, 12, tzinfo=timezone.utc)
+        assert r._known_zot_keys == set()
+        assert (self.cache_dir / "zotero_metadata.txt").exists()
+
+    def test_round_trip(self):
+        r = self._reporter()
+        when = datetime(2025, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+        r._known_zot_keys.update(["9CU8QAI9", "ABCD1234"])
+        r._set_state("40000", when)
+        r._zot_cache_flush()
+        r = self._reporter()
+        assert r.last_zot_version == "40000"
+        assert r.last_check == when
+        assert r._known_zot_keys == {"9CU8QAI9", "ABCD1234"}
+
+    def test_legacy_json(self):
+        (self.cache_dir / "zotero_metadata.json").write_text(
+            json.dumps(
+                {
+                    "last_version_checked": "39000",
+                    "last_time_checked": "2024-12-06T12:12:12+00:00",
+                }
+            ),
+            encoding="utf-8",
+        )
+        r = self._reporter()
+        assert r.last_zot_version == "39000"
+        assert r.last_check == datetime(2024, 12, 6, 12, 12, 12, tzinfo=timezone.utc)
+        assert r._known_zot_keys == set()
+        # migrated to the text cache, which is preferred from now on
+        (self.cache_dir / "zotero_metadata.json").unlink()
+        r = self._reporter()
+        assert r.last_zot_version == "39000"
+
+
+class TestParseDelay:
+    def test_seconds(self):
+        assert _parse_delay("120") == 120.0
+        assert _parse_delay("-5") == 0.0
+
+    def test_http_date(self):
+        when = datetime.now(tz=timezone.utc) + timedelta(minutes=10)
+        delay = _parse_delay(when.strftime("%a, %d %b %Y %H:%M:%S GMT"))
+        assert 590 < delay <= 600
+
+    def test_http_date_naive(self):
+        # "-0000" parses to a naive datetime, which is taken as UTC
+        assert _parse_delay("Wed, 21 Oct 2015 07:28:00 -0000") == 0.0
+
+    def test_unusable(self):
+        assert _parse_delay(None) is None
+        assert _parse_delay("soon") is None
+        assert _parse_delay("inf") is None
+        assert _parse_delay("nan") is None
+
+
+class TestZoteroCheck:
+    """Check for new items against a fake Zotero API"""
+
+    def test_check_bib_failure(self, offline):
+        webi = FakeWebi(_records(3), status={"bib": 500})
+        r = offline(webi)
+        reports = r.check()
+        assert [report.title for report in reports] == [
+            f"New in the Pleiades Zotero Library: Item {i}" for i in range(3)
+        ]
+        assert all(report.markdown == "" for report in reports)
+        assert r.last_zot_version == "40003"
+        assert r._known_zot_keys == {"K0000", "K0001", "K0002"}
+
+    def test_check_every_poll(self, offline, monkeypatch):
+        # the looper checks Zotero every 17 * 61 seconds
+        clock = [1000.0]
+        monkeypatch.setattr(zotero, "monotonic", lambda: clock[0])
+        webi = FakeWebi(_records(3))
+        r = offline(webi)
+        assert len(r.check()) == 3
+        new = _records(1, added=datetime.now(tz=timezone.utc) + timedelta(hours=1))[0]
+        new["key"] = new["data"]["key"] = "NEWKEY01"
+        new["version"] = 50000
+        webi.records.insert(0, new)
+        clock[0] += 17 * 61
+        reports = r.check()
+        assert [report.summary for report in reports] == ["Item number 0"]
+        assert r.last_zot_version == "50000"
+        assert len([req for req in webi.requests if req[0] == "HEAD"]) == 2
+
+
+class TestZoteroBackoff:
+    """Slow down as Zotero asks, and speed up again when it answers"""
+
+    def _too_many(self, r: ZoteroReporter, headers=None) -> float:
+        """Feed the reporter a 429 and return the delay it imposed on itself"""
+        with pytest.raises(ZoteroAPITooManyRequests):
+            r._parse_zot_response_for_backoff(FakeResponse(429, headers=headers))
+        return r._next_allowed - monotonic()
+
+    def test_exponential(self, offline):
+        r = offline(FakeWebi(_records(1)))
+        for attempt in range(4):
+            r._next_allowed = 0.0
+            delay = self._too_many(r)
+            expected = BACKOFF_BASE * 2**attempt
+            assert 0.5 * expected - 0.1 <= delay <= 1.5 * expected
+            assert r._retry_attempt == attempt + 1
+        assert r._wait_every_time == 0.0
+        r._parse_zot_response_for_backoff(FakeResponse(200))
+        assert r._retry_attempt == 0
+
+    def test_exponential_cap(self, offline):
+        r = offline(FakeWebi(_records(1)))
+        r._retry_attempt = 5000
+        assert self._too_many(r) <= 1.5 * BACKOFF_CAP
+
+    def test_retry_after(self, offline):
+        r = offline(FakeWebi(_records(1)))
+        delay = self._too_many(r, headers={"Retry-After": "5"})
+        assert 4.9 <= delay <= 5
+        assert r._retry_attempt == 0
+        for wait in (2.5, 1.25, 0.0):
+            r._parse_zot_response_for_backoff(FakeResponse(200))
+            assert r._wait_every_time == wait
+
+    def test_backoff_header(self, offline):
+        r = offline(FakeWebi(_records(1)))
+        r._parse_zot_response_for_backoff(FakeResponse(200, headers={"Backoff": "60"}))
+        assert 59.9 <= r._next_allowed - monotonic() <= 60
+        assert r.check() == list()
+
+
+class TestZoteroModified:
+    """List modified items by key and fetch full records only as needed"""
+
+    def _item_keys(self, webi: FakeWebi) -> list:
+        """Get the keys of all records requested in full, in order"""
+        return [k for p in webi.gets(format="json") for k in p["itemKey"].split(",")]
+
+    def test_new_records_stop_at_cutoff(self, offline):
+        records = _records(250)
+        webi = FakeWebi(records)
+        r = offline(webi)
+        cutoff = datetime.fromisoformat(records[130]["data"]["dateAdded"])
+        new = r._zot_get_new_records(since_version="38632", since_datetime=cutoff)
+        assert [d["key"] for d in new] == [d["key"] for d in records[:130]]
+        # two pages of keys, then three batches of records; none past the cutoff batch
+        assert [p["start"] for p in webi.gets(format="versions")] == [0, 100]
+        assert len(webi.gets(format="json")) == 3
+        assert self._item_keys(webi) == [d["key"] for d in records[:150]]
+
+    def test_new_records_exclude_keys(self, offline):
+        records = _records(10)
+        webi = FakeWebi(records)
+        r = offline(webi)
+        new = r._zot_get_new_records(
+            since_version="38632",
+            since_datetime=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            exclude_keys={"K0001", "K0002"},
+        )
+        assert len(new) == 8
+        assert "K0001" not in self._item_keys(webi)
+        assert "K0002" not in self._item_keys(webi)
+
+    def test_modified_first_page(self, offline):
+        webi = FakeWebi(_records(250))
+        r = offline(webi)
+        modified = r._zot_get_modified_records(
+            since_version="38632", exclude_keys={"K0000", "K0001"}
+        )
+        assert len(modified) == 98
+        assert len(webi.gets(format="versions")) == 1
+
+    def test_not_modified(self, offline):
+        webi = FakeWebi(_records(3))
+        r = offline(webi)
+        assert r._zot_get_modified_records(since_version="40003") == list()
+        assert webi.gets(format="json") == list()
+
+
+class TestZoteroVersionProbe:
+    """Reuse a library version probe only briefly, and never when bypassing caches"""
+
+    def _heads(self, webi: FakeWebi) -> int:
+        return len([req for req in webi.requests if req[0] == "HEAD"])
+
+    def test_bypass_cache(self, offline):
+        webi = FakeWebi(_records(3))
+        r = offline(webi)
+        for _ in range(2):
+            assert r._check_for_latest_version(bypass_cache=True) == "40003"
+        assert self._heads(webi) == 2
+
+    def test_memo(self, offline, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(zotero, "monotonic", lambda: clock[0])
+        webi = FakeWebi(_records(3))
+        r = offline(webi)
+        assert r._check_for_latest_version(bypass_cache=False) == "40003"
+        # another reporter within the TTL reuses the probe
+        assert offline(webi)._check_for_latest_version(bypass_cache=False) == "40003"
+        assert self._heads(webi) == 1
+        clock[0] += zotero.VERSION_PROBE_TTL
+        assert r._check_for_latest_version(bypass_cache=False) == "40003"
+        assert self._heads(webi) == 2